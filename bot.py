@@ -1,18 +1,21 @@
 import asyncio
+import base64
 import html
-import json
+import itertools
 import logging
+import math
 import os
+import re
 import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Union
 from urllib.parse import urlparse
-from uuid import uuid4
 
 import httpx
+import orjson
 from dotenv import load_dotenv
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.constants import ParseMode
 from telegram.ext import (
     Application,
@@ -27,11 +30,17 @@ from telegram.request import HTTPXRequest
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_FILE = BASE_DIR / "data.json"
+JOURNAL_FILE = DATA_FILE.with_suffix(".jsonl")
 LOG_DIR = BASE_DIR / "logs"
 LOG_FILE = LOG_DIR / "bot.log"
 
 load_dotenv(BASE_DIR / ".env")
 
+COOLDOWN_SECS = 60
+# В памяти last_sent хранит time.monotonic(), на диске — unix-время (int),
+# так что перевод часов не влияет на антиспам, а значения переживают рестарт.
+_MONOTONIC_OFFSET = time.time() - time.monotonic()
+
 
 def setup_logging() -> logging.Logger:
     handlers = [logging.StreamHandler()]
@@ -93,8 +102,12 @@ class NoProxyHTTPXRequest(HTTPXRequest):
     def _build_client(self) -> httpx.AsyncClient:
         kwargs = dict(self._client_kwargs)
         if self._force_ipv4:
+            # при явном transport клиент не применяет свои limits/http2 сам
             kwargs["transport"] = httpx.AsyncHTTPTransport(
                 local_address="0.0.0.0",
+                limits=kwargs["limits"],
+                http1=kwargs["http1"],
+                http2=kwargs["http2"],
             )
         return httpx.AsyncClient(**kwargs, trust_env=False)
 
@@ -143,34 +156,231 @@ def load_config() -> Dict[str, Any]:
     }
 
 
+def _apply_event(
+    event: Dict[str, Any],
+    admins: Set[int],
+    pending: Dict[str, Any],
+    last_sent: Dict[str, Any],
+) -> None:
+    op = event.get("op")
+    if op == "pending_add":
+        pending[event["id"]] = event["entry"]
+    elif op == "pending_remove":
+        pending.pop(event["id"], None)
+    elif op == "last_sent":
+        last_sent[event["user"]] = event["ts"]
+    elif op == "admin_add":
+        admins.add(event["id"])
+    elif op == "admin_remove":
+        admins.discard(event["id"])
+    else:
+        logger.warning("Неизвестная операция в журнале: %s", op)
+
+
+LOAD_BUFFER_SIZE = 1 << 20
+
+
 def load_state(main_admin_id: int) -> Dict[str, Any]:
-    if not DATA_FILE.exists():
-        return {"admins": [main_admin_id], "pending": {}, "last_sent": {}}
-    with DATA_FILE.open("r", encoding="utf-8") as fh:
-        data = json.load(fh)
+    data: Dict[str, Any] = {}
+    if DATA_FILE.exists():
+        with DATA_FILE.open("rb", buffering=LOAD_BUFFER_SIZE) as fh:
+            data = orjson.loads(fh.read())
     admins = set(data.get("admins") or [])
+    pending = data.get("pending") or {}
+    last_sent = data.get("last_sent") or {}
+    if JOURNAL_FILE.exists():
+        # журнал разбирается построчно из байтов: в памяти одна запись, а не
+        # весь файл, и без промежуточного декодирования в str
+        with JOURNAL_FILE.open("rb", buffering=LOAD_BUFFER_SIZE) as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    event = orjson.loads(line)
+                except ValueError:
+                    # недописанная строка после аварийного завершения
+                    logger.warning("Пропущена поврежденная строка журнала")
+                    continue
+                _apply_event(event, admins, pending, last_sent)
     admins.add(main_admin_id)
+    # держим только активные кулдауны, упорядоченные по времени (см. _gc_last_sent)
+    now = int(time.time())
+    active = sorted(
+        (ts, user) for user, ts in last_sent.items() if now - ts < COOLDOWN_SECS
+    )
+    return {
+        "admins": admins,
+        "pending": pending,
+        "last_sent": {user: ts - _MONOTONIC_OFFSET for ts, user in active},
+    }
+
+
+def _to_unix(ts: float) -> int:
+    return int(ts + _MONOTONIC_OFFSET)
+
+
+def _state_for_disk() -> Dict[str, Any]:
     return {
-        "admins": list(admins),
-        "pending": data.get("pending") or {},
-        "last_sent": data.get("last_sent") or {},
+        **STATE,
+        "admins": sorted(STATE["admins"]),
+        "last_sent": {user: _to_unix(ts) for user, ts in STATE["last_sent"].items()},
     }
 
 
-def save_state(state: Dict[str, Any]) -> None:
+def _snapshot_state() -> bytes:
+    return orjson.dumps(_state_for_disk(), option=orjson.OPT_NON_STR_KEYS)
+
+
+def _fsync_dir(path: Path) -> None:
+    if os.name != "posix":
+        return  # на Windows каталог нельзя открыть для fsync
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_blob(blob: bytes) -> None:
     tmp = DATA_FILE.with_suffix(".tmp")
-    with tmp.open("w", encoding="utf-8") as fh:
-        json.dump(state, fh, ensure_ascii=False, indent=2)
-    tmp.replace(DATA_FILE)
+    with SAVE_LOCK:
+        with tmp.open("wb") as fh:
+            fh.write(blob)
+            if DURABLE:
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.replace(tmp, DATA_FILE)
+        if DURABLE:
+            _fsync_dir(DATA_FILE.parent)
+        # снимок уже содержит все события журнала
+        JOURNAL_FILE.write_bytes(b"")
+
+
+def _append_lines(data: bytes) -> None:
+    with SAVE_LOCK:
+        with JOURNAL_FILE.open("ab") as fh:
+            fh.write(data)
+            if DURABLE:
+                fh.flush()
+                os.fsync(fh.fileno())
+
+
+async def save_state_async(blob: bytes) -> None:
+    await asyncio.to_thread(_write_blob, blob)
 
 
 STATE: Dict[str, Any] = {}
 STATE_LOCK = asyncio.Lock()
 CONFIG: Dict[str, Any] = {}
+# Копии значений CONFIG, которые читаются в каждом обработчике; задаются в main().
+MOD_CHAT_ID: Union[int, str, None] = None
+PUBLIC_CHAT_ID: Union[int, str, None] = None
+MAIN_ADMIN_ID: Optional[int] = None
+# Неизменяемая копия STATE["admins"] для проверок прав без STATE_LOCK:
+# пишущие под блокировкой подменяют ее целиком, читатели видят старую или новую.
+_ADMINS: FrozenSet[int] = frozenset()
+
+# Каждая мутация добавляет событие в журнал data.jsonl (одна строка на событие),
+# а не переписывает data.json целиком. _flush_loop дописывает накопленные
+# события не чаще раза в FLUSH_INTERVAL секунд; когда в журнале набирается
+# COMPACT_EVERY строк, он сворачивается в снимок data.json и обнуляется.
+FLUSH_INTERVAL = 1.0
+COMPACT_EVERY = 1000
+# STATE_DURABILITY=fast (по умолчанию): запись остается в page cache ОС, данные
+# переживают падение процесса, но не отключение питания. durable: fsync файла
+# и каталога после каждой записи — переживает и сбой ОС, но каждая запись
+# ждет диск.
+DURABLE = (os.environ.get("STATE_DURABILITY") or "fast").strip().lower() == "durable"
+SAVE_LOCK = threading.Lock()
+_dirty = asyncio.Event()
+_events: List[Dict[str, Any]] = []
+_journal_lines = 0
+_flush_task: Optional[asyncio.Task] = None
+
+
+def _append_event(event: Dict[str, Any]) -> None:
+    """Queue a journal event. The caller must hold STATE_LOCK."""
+    _events.append(event)
+    _dirty.set()
+
+
+async def flush_state() -> None:
+    global _journal_lines
+    async with STATE_LOCK:
+        events = _events[:]
+        _events.clear()
+        _dirty.clear()
+        blob = None
+        if _journal_lines + len(events) >= COMPACT_EVERY:
+            blob = _snapshot_state()
+    try:
+        if blob is not None:
+            await save_state_async(blob)
+            _journal_lines = 0
+        elif events:
+            data = b"".join(orjson.dumps(ev) + b"\n" for ev in events)
+            await asyncio.to_thread(_append_lines, data)
+            _journal_lines += len(events)
+    except Exception:
+        async with STATE_LOCK:
+            _events[:0] = events
+        raise
+
+
+async def _flush_loop() -> None:
+    while True:
+        await _dirty.wait()
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await flush_state()
+        except Exception:  # noqa: BLE001
+            logger.exception("Не удалось сохранить состояние, повторим позже")
+            _dirty.set()
+
+
+async def start_flush_loop(application: Application) -> None:
+    global _flush_task
+    _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_flush_loop(application: Application) -> None:
+    if _flush_task:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+    if _dirty.is_set():
+        await flush_state()
+
+
+# Счетчик стартует с unix-времени << 20, поэтому id не повторяются между
+# перезапусками (если не создавать больше 2**20 заявок в секунду аптайма).
+_req_counter = itertools.count(int(time.time()) << 20)
+
+
+def _new_id() -> str:
+    """Return an 11-character URL-safe request id."""
+    raw = next(_req_counter).to_bytes(8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _gc_last_sent(now: float) -> None:
+    """Drop expired cooldowns. The caller must hold STATE_LOCK.
+
+    last_sent is kept in send order (a user is re-inserted on every send),
+    so expired entries are always at the front.
+    """
+    last_sent = STATE["last_sent"]
+    while last_sent:
+        user = next(iter(last_sent))
+        if now - last_sent[user] < COOLDOWN_SECS:
+            break
+        del last_sent[user]
 
 
 def moderator_only(user_id: int) -> bool:
-    return user_id in STATE.get("admins", [])
+    return user_id in _ADMINS
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -198,14 +408,19 @@ async def text_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await queue_message(update, context, text, force_anon=False)
 
 
+# "/anon текст" и "/anon@bot текст" (в группах), но не "/anonymous"
+_ANON_RE = re.compile(r"^/anon(?:@\w+)?(?:\s+|$)(.*)$", re.S)
+
+
 async def photo_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not update.message or not update.message.photo:
         return
     caption = (update.message.caption or "").strip()
     force_anon = False
-    if caption.startswith("/anon"):
+    match = _ANON_RE.match(caption)
+    if match:
         force_anon = True
-        caption = caption[len("/anon"):].lstrip()
+        caption = match.group(1).lstrip()
     photo_id = update.message.photo[-1].file_id
     await queue_message(
         update,
@@ -222,9 +437,10 @@ async def video_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
     caption = (update.message.caption or "").strip()
     force_anon = False
-    if caption.startswith("/anon"):
+    match = _ANON_RE.match(caption)
+    if match:
         force_anon = True
-        caption = caption[len("/anon"):].lstrip()
+        caption = match.group(1).lstrip()
     video_id = update.message.video.file_id
     await queue_message(
         update,
@@ -248,18 +464,8 @@ async def queue_message(
     user = update.effective_user
     if not user:
         return
-    request_id = str(uuid4())
-    now = int(time.time())
-    async with STATE_LOCK:
-        last_sent = STATE.get("last_sent", {})
-        last = last_sent.get(str(user.id))
-        if last and now - last < 60:
-            wait_for = 60 - (now - last)
-            await update.message.reply_text(
-                f"Можно отправлять одно сообщение в минуту. Подождите еще {wait_for} сек."
-            )
-            return
-        STATE["last_sent"] = last_sent
+    request_id = _new_id()
+    now = time.monotonic()
     entry = {
         "type": message_type,
         "user_id": user.id,
@@ -268,64 +474,90 @@ async def queue_message(
         "last_name": user.last_name,
         "text": text,
         "force_anon": force_anon,
+        "name_html": html.escape(
+            " ".join(p for p in (user.first_name, user.last_name) if p) or "пользователь"
+        ),
+        "username_label_html": html.escape(
+            f"@{user.username}" if user.username else "без username"
+        ),
     }
     if message_type == "photo" and photo_id:
         entry["photo_id"] = photo_id
     if message_type == "video" and video_id:
         entry["video_id"] = video_id
+    user_key = str(user.id)
+    wait_for = 0
     async with STATE_LOCK:
-        STATE["last_sent"][str(user.id)] = now
-        STATE["pending"][request_id] = entry
-        save_state(STATE)
+        _gc_last_sent(now)
+        last_sent = STATE["last_sent"]
+        last = last_sent.get(user_key)
+        if last is not None and now - last < COOLDOWN_SECS:
+            wait_for = math.ceil(COOLDOWN_SECS - (now - last))
+        else:
+            last_sent.pop(user_key, None)
+            last_sent[user_key] = now
+            STATE["pending"][request_id] = entry
+            _append_event({"op": "last_sent", "user": user_key, "ts": _to_unix(now)})
+            _append_event({"op": "pending_add", "id": request_id, "entry": entry})
+    if wait_for:
+        await update.message.reply_text(
+            f"Можно отправлять одно сообщение в минуту. Подождите еще {wait_for} сек."
+        )
+        return
     await update.message.reply_text(
         "Отправлено на модерацию. После одобрения сообщение появится в канале."
     )
     await send_to_moderators(context, request_id, entry)
 
 
+# Короткие префиксы экономят место в callback_data (Telegram ограничивает его
+# 64 байтами); полные имена оставлены для кнопок, отправленных раньше.
+CALLBACK_ACTIONS = {"a": "approve", "r": "reject", "approve": "approve", "reject": "reject"}
+
+
+def _mod_buttons(request_id: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup.from_column([
+        InlineKeyboardButton("Опубликовать", callback_data=f"a:{request_id}"),
+        InlineKeyboardButton("Отклонить", callback_data=f"r:{request_id}"),
+    ])
+
+
 async def send_to_moderators(
     context: ContextTypes.DEFAULT_TYPE,
     request_id: str,
     entry: Dict[str, Any],
 ) -> None:
-    username = entry.get("username")
-    name_parts = [entry.get("first_name"), entry.get("last_name")]
-    name = " ".join([p for p in name_parts if p]) or "пользователь"
-    username_label = f"@{username}" if username else "без username"
     requested_anon = "да" if entry.get("force_anon") else "нет"
     header = (
         f"Новое сообщение #{request_id}\n"
-        f"От: <a href=\"tg://user?id={entry['user_id']}\">{html.escape(name)}</a> "
-        f"({html.escape(username_label)}, id={entry['user_id']})\n"
+        f"От: <a href=\"tg://user?id={entry['user_id']}\">{entry['name_html']}</a> "
+        f"({entry['username_label_html']}, id={entry['user_id']})\n"
         f"Анонимность запрошена: {requested_anon}"
     )
     body = html.escape(entry.get("text") or "")
     full_text = f"{header}\n\n{body}" if body else header
-    buttons = [
-        [InlineKeyboardButton("Опубликовать", callback_data=f"approve:{request_id}")],
-        [InlineKeyboardButton("Отклонить", callback_data=f"reject:{request_id}")],
-    ]
+    buttons = _mod_buttons(request_id)
     if entry.get("type") == "photo" and entry.get("photo_id"):
         await context.bot.send_photo(
-            chat_id=CONFIG["mod_chat_id"],
+            chat_id=MOD_CHAT_ID,
             photo=entry["photo_id"],
             caption=full_text,
-            reply_markup=InlineKeyboardMarkup(buttons),
+            reply_markup=buttons,
             parse_mode=ParseMode.HTML,
         )
     elif entry.get("type") == "video" and entry.get("video_id"):
         await context.bot.send_video(
-            chat_id=CONFIG["mod_chat_id"],
+            chat_id=MOD_CHAT_ID,
             video=entry["video_id"],
             caption=full_text,
-            reply_markup=InlineKeyboardMarkup(buttons),
+            reply_markup=buttons,
             parse_mode=ParseMode.HTML,
         )
     else:
         await context.bot.send_message(
-            chat_id=CONFIG["mod_chat_id"],
+            chat_id=MOD_CHAT_ID,
             text=full_text,
-            reply_markup=InlineKeyboardMarkup(buttons),
+            reply_markup=buttons,
             parse_mode=ParseMode.HTML,
         )
 
@@ -334,22 +566,24 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     if not query:
         return
-    await query.answer()
+    # на callback отвечаем ровно один раз в каждой ветке: повторный answer()
+    # Telegram игнорирует, но он все равно стоит отдельного запроса
     actor = query.from_user
     origin_chat_id = query.message.chat_id if query.message else None
-    is_mod_chat = origin_chat_id == CONFIG.get("mod_chat_id")
+    is_mod_chat = origin_chat_id == MOD_CHAT_ID
     if not (moderator_only(actor.id) or is_mod_chat):
         await query.answer("Недостаточно прав", show_alert=True)
         return
     data = (query.data or "").split(":")
-    if len(data) < 2:
+    if len(data) < 2 or data[0] not in CALLBACK_ACTIONS:
+        await query.answer()
         return
-    action, request_id = data[0], data[1]
+    action, request_id = CALLBACK_ACTIONS[data[0]], data[1]
 
     async with STATE_LOCK:
-        entry = STATE.get("pending", {}).pop(request_id, None)
+        entry = STATE["pending"].pop(request_id, None)
         if entry:
-            save_state(STATE)
+            _append_event({"op": "pending_remove", "id": request_id})
 
     if not entry:
         await query.answer("Заявка уже обработана", show_alert=True)
@@ -357,22 +591,22 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
 
     if action == "approve":
-        await publish(entry, context)
-        await query.edit_message_reply_markup(reply_markup=None)
-        status_note = f"\n\nСтатус: одобрено модератором {actor.id}"
         try:
-            if query.message and query.message.caption:
-                await query.edit_message_caption((query.message.caption or "") + status_note, reply_markup=None)
-            elif query.message and query.message.text:
-                await query.edit_message_text((query.message.text or "") + status_note, reply_markup=None)
-            else:
-                await query.edit_message_reply_markup(reply_markup=None)
+            await publish(entry, context)
         except Exception:
-            await query.edit_message_reply_markup(reply_markup=None)
-    elif action == "reject":
+            # заявка не опубликована: возвращаем ее в очередь, кнопки остаются,
+            # и модератор может повторить
+            async with STATE_LOCK:
+                STATE["pending"][request_id] = entry
+                _append_event({"op": "pending_add", "id": request_id, "entry": entry})
+            await query.answer("Не удалось опубликовать", show_alert=True)
+            raise
+    else:
         await notify_reject(context, entry)
+    verdict = "одобрено" if action == "approve" else "отклонено"
+    status_note = f"\n\nСтатус: {verdict} модератором {actor.id}"
+    try:
         await query.edit_message_reply_markup(reply_markup=None)
-        status_note = f"\n\nСтатус: отклонено модератором {actor.id}"
         try:
             if query.message and query.message.caption:
                 await query.edit_message_caption((query.message.caption or "") + status_note, reply_markup=None)
@@ -382,6 +616,8 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 await query.edit_message_reply_markup(reply_markup=None)
         except Exception:
             await query.edit_message_reply_markup(reply_markup=None)
+    finally:
+        await query.answer()
 
 
 async def publish(
@@ -392,40 +628,41 @@ async def publish(
     text = entry.get("text") or ""
     if entry.get("type") == "photo" and entry.get("photo_id"):
         await context.bot.send_photo(
-            chat_id=CONFIG["public_chat_id"],
+            chat_id=PUBLIC_CHAT_ID,
             photo=entry["photo_id"],
             caption=text or None,
         )
     elif entry.get("type") == "video" and entry.get("video_id"):
         await context.bot.send_video(
-            chat_id=CONFIG["public_chat_id"],
+            chat_id=PUBLIC_CHAT_ID,
             video=entry["video_id"],
             caption=text or None,
         )
     else:
-        await context.bot.send_message(chat_id=CONFIG["public_chat_id"], text=text or "-")
+        await context.bot.send_message(chat_id=PUBLIC_CHAT_ID, text=text or "-")
+    context.application.create_task(
+        _safe_notify(context.bot, entry["user_id"], "Ваше сообщение опубликовано. Спасибо!")
+    )
+
+
+async def _safe_notify(bot: Bot, chat_id: int, text: str) -> None:
     try:
-        await context.bot.send_message(
-            chat_id=entry["user_id"],
-            text="Ваше сообщение опубликовано. Спасибо!",
-        )
+        await bot.send_message(chat_id=chat_id, text=text)
     except Exception as exc:  # noqa: BLE001
         logger.warning("Не удалось уведомить автора: %s", exc)
 
 
 async def notify_reject(context: ContextTypes.DEFAULT_TYPE, entry: Dict[str, Any]) -> None:
-    try:
-        await context.bot.send_message(
-            chat_id=entry["user_id"],
-            text="Сообщение отклонено модератором.",
-        )
-    except Exception as exc:  # noqa: BLE001
-        logger.warning("Failed to notify author: %s", exc)
+    # автор мог заблокировать бота; модератор не должен ждать этот запрос
+    context.application.create_task(
+        _safe_notify(context.bot, entry["user_id"], "Сообщение отклонено модератором.")
+    )
 
 
 async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    global _ADMINS
     user_id = update.effective_user.id if update.effective_user else None
-    if user_id != CONFIG["main_admin_id"]:
+    if user_id != MAIN_ADMIN_ID:
         await update.message.reply_text("Команда доступна только главному администратору.")
         return
     if not context.args:
@@ -437,16 +674,16 @@ async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text("id должен быть числом.")
         return
     async with STATE_LOCK:
-        admins = set(STATE.get("admins", []))
-        admins.add(new_admin)
-        STATE["admins"] = list(admins)
-        save_state(STATE)
+        STATE["admins"].add(new_admin)
+        _ADMINS = frozenset(STATE["admins"])
+        _append_event({"op": "admin_add", "id": new_admin})
     await update.message.reply_text(f"Администратор {new_admin} добавлен.")
 
 
 async def remove_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    global _ADMINS
     user_id = update.effective_user.id if update.effective_user else None
-    if user_id != CONFIG["main_admin_id"]:
+    if user_id != MAIN_ADMIN_ID:
         await update.message.reply_text("Команда доступна только главному администратору.")
         return
     if not context.args:
@@ -457,14 +694,13 @@ async def remove_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     except ValueError:
         await update.message.reply_text("id должен быть числом.")
         return
-    if target == CONFIG["main_admin_id"]:
+    if target == MAIN_ADMIN_ID:
         await update.message.reply_text("Нельзя удалить главного администратора.")
         return
     async with STATE_LOCK:
-        admins = set(STATE.get("admins", []))
-        admins.discard(target)
-        STATE["admins"] = list(admins)
-        save_state(STATE)
+        STATE["admins"].discard(target)
+        _ADMINS = frozenset(STATE["admins"])
+        _append_event({"op": "admin_remove", "id": target})
     await update.message.reply_text(f"Администратор {target} удален.")
 
 
@@ -472,7 +708,7 @@ async def list_admins(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if not moderator_only(update.effective_user.id):
         await update.message.reply_text("Недостаточно прав.")
         return
-    admins = ", ".join(str(a) for a in sorted(STATE.get("admins", [])))
+    admins = ", ".join(str(a) for a in sorted(_ADMINS))
     await update.message.reply_text(f"Текущие администраторы: {admins}")
 
 
@@ -480,35 +716,81 @@ async def pending(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not moderator_only(update.effective_user.id):
         await update.message.reply_text("Недостаточно прав.")
         return
-    count = len(STATE.get("pending", {}))
+    count = len(STATE["pending"])
     await update.message.reply_text(f"Заявок в очереди: {count}")
 
 
+async def dump_state(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not moderator_only(update.effective_user.id):
+        await update.message.reply_text("Недостаточно прав.")
+        return
+    async with STATE_LOCK:
+        blob = orjson.dumps(
+            _state_for_disk(),
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2,
+        )
+    await update.message.reply_document(document=blob, filename="data.json")
+
+
+TEXT_FILTER = filters.TEXT & ~filters.COMMAND
+
+
 def main() -> None:
-    global CONFIG, STATE
+    global CONFIG, STATE, _ADMINS, MOD_CHAT_ID, PUBLIC_CHAT_ID, MAIN_ADMIN_ID
     CONFIG = load_config()
-    STATE = load_state(CONFIG["main_admin_id"])
+    MOD_CHAT_ID = CONFIG["mod_chat_id"]
+    PUBLIC_CHAT_ID = CONFIG["public_chat_id"]
+    MAIN_ADMIN_ID = CONFIG["main_admin_id"]
+    STATE = load_state(MAIN_ADMIN_ID)
+    _ADMINS = frozenset(STATE["admins"])
+    _write_blob(_snapshot_state())
     start_health_server()
+    # HTTP/2 мультиплексирует параллельные вызовы API (публикации, рассылка
+    # модераторам) в одном соединении; пул нужен для concurrent_updates.
     request = NoProxyHTTPXRequest(
         proxy=None,
         force_ipv4=CONFIG.get("force_ipv4", False),
+        connection_pool_size=64,
+        http_version="2",
+        read_timeout=20,
+        write_timeout=20,
+    )
+    get_updates_request = NoProxyHTTPXRequest(
+        proxy=None,
+        force_ipv4=CONFIG.get("force_ipv4", False),
+        http_version="2",
     )
     logger.info(
         "Бот запускается (proxy=disabled, force_ipv4=%s)",
         CONFIG.get("force_ipv4"),
     )
-    application = Application.builder().token(CONFIG["token"]).request(request).build()
+    application = (
+        Application.builder()
+        .token(CONFIG["token"])
+        .request(request)
+        .get_updates_request(get_updates_request)
+        # апдейты разных пользователей обрабатываются параллельно; общее
+        # состояние защищено STATE_LOCK
+        .concurrent_updates(True)
+        .post_init(start_flush_loop)
+        .post_shutdown(stop_flush_loop)
+        .build()
+    )
 
-    application.add_handler(CommandHandler("start", start_command))
+    # обработчики, которые только читают STATE и отвечают, не блокируют очередь
+    application.add_handler(CommandHandler("start", start_command, block=False))
     application.add_handler(CommandHandler("anon", anon_command))
     application.add_handler(CommandHandler("add_admin", add_admin))
     application.add_handler(CommandHandler("remove_admin", remove_admin))
-    application.add_handler(CommandHandler("admins", list_admins))
-    application.add_handler(CommandHandler("pending", pending))
+    application.add_handler(CommandHandler("admins", list_admins, block=False))
+    application.add_handler(CommandHandler("pending", pending, block=False))
+    application.add_handler(CommandHandler("dump_state", dump_state, block=False))
     application.add_handler(CallbackQueryHandler(handle_callback))
-    application.add_handler(MessageHandler(filters.VIDEO, video_message))
+    # фильтры не пересекаются, поэтому порядок влияет только на число проверок:
+    # самые частые, текстовые, сообщения проверяются первыми
+    application.add_handler(MessageHandler(TEXT_FILTER, text_message))
     application.add_handler(MessageHandler(filters.PHOTO, photo_message))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_message))
+    application.add_handler(MessageHandler(filters.VIDEO, video_message))
 
     logger.info("Бот запущен")
     # drop_pending_updates=True на всякий случай очищает накопившуюся очередь